@@ -1,22 +1,48 @@
+import io
+import itertools
 import os
+import re
 import time
+import atexit
+import bisect
+import collections
 import logging
+import logging.handlers
 import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-import json
+import orjson
+import queue
+import threading
 import requests
-from apscheduler.schedulers.background import BackgroundScheduler
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from apscheduler.schedulers.blocking import BlockingScheduler
 import tweepy
 from flask import Flask, request
 
 # ------------------------------------------------------------
 # CONFIG & LOGGING
 # ------------------------------------------------------------
+# Records go through a queue so file/console writes happen on a listener thread,
+# not on the tweet/event/HF hot paths. DEBUG is opt-in via LOG_LEVEL=DEBUG.
+# The QueueHandler formats each record, so the listener's handlers write it as-is.
+_log_queue = queue.Queue(-1)
+log_listener = logging.handlers.QueueListener(
+    _log_queue, logging.FileHandler("9dttt_bot.log"), logging.StreamHandler()
+)
+_requested_log_level = os.getenv('LOG_LEVEL', 'INFO').upper()
+# getLevelName maps known names to ints (works before 3.11's getLevelNamesMapping)
+LOG_LEVEL = _requested_log_level if isinstance(logging.getLevelName(_requested_log_level), int) else 'INFO'
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=LOG_LEVEL,
     format='%(asctime)s - 9DTTT BOT LOG - %(levelname)s - %(message)s',
-    handlers=[logging.FileHandler("9dttt_bot.log"), logging.StreamHandler()]
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
+log_listener.start()
+atexit.register(log_listener.stop)  # flush queued records on exit
+if LOG_LEVEL != _requested_log_level:
+    logging.warning("Unknown LOG_LEVEL=%r, using INFO", _requested_log_level)
 
 GAME_LINK = "https://www.9dttt.com"
 BOT_NAME = "9DTTT BOT"
@@ -33,6 +59,10 @@ BROADCAST_MAX_INTERVAL = 240 if PAID_TIER else 1440  # 4h paid, 24h free
 MENTION_CHECK_MIN_INTERVAL = 15 if PAID_TIER else 60
 MENTION_CHECK_MAX_INTERVAL = 30 if PAID_TIER else 120
 
+# Real-time mentions via the v2 filtered stream (needs an API tier with stream
+# access). When off, or if the stream can't start, mentions are polled instead.
+USE_MENTION_STREAM = os.getenv('MENTION_STREAM', 'false').lower() == 'true'
+
 # ------------------------------------------------------------
 # TWITTER AUTH
 # ------------------------------------------------------------
@@ -68,35 +98,130 @@ auth_v1 = tweepy.OAuth1UserHandler(
 )
 api_v1 = tweepy.API(auth_v1, wait_on_rate_limit=True)
 
+# The authenticated account never changes for the process lifetime, so look it
+# up once, lazily, from the first mention check or stream start. Not at import:
+# with wait_on_rate_limit=True a 429 makes tweepy sleep until the reset, which
+# would hang every importer (e.g. gunicorn workers that never need it).
+# A lookup that errors out is retried on the next mention check.
+BOT_USER_ID = None
+BOT_USERNAME = None
+MENTION_RE = None
+
+def cache_bot_identity():
+    global BOT_USER_ID, BOT_USERNAME, MENTION_RE
+    try:
+        me = client.get_me(user_auth=True)
+        if me and me.data:
+            BOT_USER_ID = me.data.id
+            BOT_USERNAME = me.data.username
+            MENTION_RE = re.compile(rf"@{re.escape(BOT_USERNAME)}\b", re.IGNORECASE)
+    except Exception as e:
+        logging.warning("get_me failed, will retry on next mention check: %s", e)
+    return BOT_USER_ID is not None
+
 # ------------------------------------------------------------
 # SAFE POST TWEET - v2 + v1.1 fallback
 # ------------------------------------------------------------
+# X counts "weighted" characters: code points in these ranges weigh 1, everything
+# else (emoji, CJK, ...) weighs 2, and every URL counts as its t.co length.
+# Counting locally avoids a rejected post.
+TWITTER_LIGHT_RANGES = ((0, 4351), (8192, 8205), (8208, 8223), (8242, 8247))
+TWITTER_URL_WEIGHT = 23
+# Trailing punctuation after a link isn't part of it on X either
+TWITTER_URL_RE = re.compile(r"(?:https?://|www\.)\S*[^\s.,!?;:)\]'\"…]")
+
+def twitter_char_weight(ch):
+    cp = ord(ch)
+    for lo, hi in TWITTER_LIGHT_RANGES:
+        if lo <= cp <= hi:
+            return 1
+    return 2
+
+def twitter_weighted_units(s):
+    # (start, end, weight) per code point, with each URL as one unbreakable unit
+    pos = 0
+    for m in TWITTER_URL_RE.finditer(s):
+        for i in range(pos, m.start()):
+            yield i, i + 1, twitter_char_weight(s[i])
+        yield m.start(), m.end(), TWITTER_URL_WEIGHT
+        pos = m.end()
+    for i in range(pos, len(s)):
+        yield i, i + 1, twitter_char_weight(s[i])
+
+def twitter_weighted_len(s):
+    return sum(w for _, _, w in twitter_weighted_units(s))
+
+def truncate_weighted(s, limit, suffix=""):
+    # Single pass: remember where suffix would still fit, bail once over limit.
+    # URLs are never cut in half; a link that doesn't fit is dropped whole.
+    budget = limit - twitter_weighted_len(suffix)
+    total = 0
+    cut = None
+    for start, _, w in twitter_weighted_units(s):
+        total += w
+        if cut is None and total > budget:
+            cut = start
+        if total > limit:
+            return s[:cut] + suffix
+    return s
+
+# 429 isn't listed: with wait_on_rate_limit=True tweepy already sleeps until the
+# reset and retries inside Client.request, so it never reaches us.
+RETRYABLE_STATUS = (500, 502, 503, 504)
+MAX_POST_ATTEMPTS = 3
+
+def post_retry_delay(attempt):
+    return 2 ** attempt + random.random()
+
 def safe_post_tweet(text, media_ids=None, in_reply_to_tweet_id=None):
     global PAID_TIER, USE_LLM
     original_text = text
-    if len(text) > TWITTER_CHAR_LIMIT:
+    if twitter_weighted_len(text) > TWITTER_CHAR_LIMIT:
         if in_reply_to_tweet_id:
-            text = text[:TWITTER_CHAR_LIMIT - 60] + "..."
+            text = truncate_weighted(text, TWITTER_CHAR_LIMIT - 57, "...")
         else:
-            text = text[:TWITTER_CHAR_LIMIT - 20] + "…"
-    try:
-        kwargs = {"text": text}
-        if media_ids:
-            kwargs["media_ids"] = media_ids
-        if in_reply_to_tweet_id:
-            kwargs["in_reply_to_tweet_id"] = in_reply_to_tweet_id
-        client.create_tweet(**kwargs)
-        logging.info(f"Posted via v2: {original_text[:60]}...")
-        return True
-    except tweepy.TweepyException as e:
-        err = str(e).lower()
-        if "402" in err or "creditsdepleted" in err or "payment required" in err or "403" in err or "rate limit" in err:
-            logging.warning(f"X API issue ({err}): switching to lite mode")
-            PAID_TIER = False
-            USE_LLM = False
-        else:
-            logging.error(f"v2 error: {e}")
-            return False
+            text = truncate_weighted(text, TWITTER_CHAR_LIMIT - 19, "…")
+    kwargs = {"text": text}
+    if media_ids:
+        kwargs["media_ids"] = media_ids
+    if in_reply_to_tweet_id:
+        kwargs["in_reply_to_tweet_id"] = in_reply_to_tweet_id
+    # Retry transient failures (5xx/network) with backoff before giving up
+    for attempt in range(MAX_POST_ATTEMPTS):
+        last_try = attempt == MAX_POST_ATTEMPTS - 1
+        try:
+            client.create_tweet(**kwargs)
+            logging.info("Posted via v2: %s...", original_text[:60])
+            return True
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if last_try:
+                logging.error(f"v2 network error: {e}")
+                return False
+            delay = post_retry_delay(attempt)
+        except tweepy.TweepyException as e:
+            code = getattr(getattr(e, "response", None), "status_code", None)
+            err = str(e).lower()
+            if code in RETRYABLE_STATUS and not last_try:
+                delay = post_retry_delay(attempt)
+            elif "duplicate" in err:
+                # create_tweet isn't idempotent: a 5xx/reset can land after X already
+                # posted, so a duplicate on a retry means the earlier attempt worked.
+                # Either way it's not a tier problem, and v1.1 would reject it too.
+                if attempt > 0:
+                    logging.info("Posted via v2 (confirmed by duplicate on retry): %s...", original_text[:60])
+                    return True
+                logging.error(f"v2 duplicate content: {e}")
+                return False
+            else:
+                if "402" in err or "creditsdepleted" in err or "payment required" in err or "403" in err or "rate limit" in err:
+                    logging.warning("X API issue (%s): switching to lite mode", err)
+                    PAID_TIER = False
+                    USE_LLM = False
+                    break
+                logging.error(f"v2 error: {e}")
+                return False
+        logging.warning("v2 transient failure, retrying in %.1fs (attempt %d/%d)", delay, attempt + 1, MAX_POST_ATTEMPTS)
+        time.sleep(delay)
     try:
         kwargs_v1 = {"status": text}
         if media_ids:
@@ -105,7 +230,7 @@ def safe_post_tweet(text, media_ids=None, in_reply_to_tweet_id=None):
             kwargs_v1["in_reply_to_status_id"] = in_reply_to_tweet_id
             kwargs_v1["auto_populate_reply_metadata"] = True
         api_v1.update_status(**kwargs_v1)
-        logging.info(f"Posted via v1.1 fallback: {original_text[:60]}...")
+        logging.info("Posted via v1.1 fallback: %s...", original_text[:60])
         return True
     except Exception as e:
         logging.error(f"v1.1 fallback failed: {e}")
@@ -116,41 +241,171 @@ def safe_post_tweet(text, media_ids=None, in_reply_to_tweet_id=None):
 # ------------------------------------------------------------
 app = Flask(__name__)
 
+# Events are queued and coalesced: the worker wakes on the first event, waits
+# EVENT_FLUSH_WINDOW seconds for a burst to land, then posts one tweet per type.
+# A thread (not a scheduler job) so it also runs when Flask is served by gunicorn.
+EVENT_FLUSH_WINDOW = 60  # seconds
+EVENT_QUEUE_MAX = 1000  # bound memory if Twitter is down and events pile up
+EVENT_QUEUE = queue.Queue(maxsize=EVENT_QUEUE_MAX)
+_event_worker = None
+_event_worker_lock = threading.Lock()
+
+def ensure_event_worker():
+    global _event_worker
+    with _event_worker_lock:
+        if _event_worker is None or not _event_worker.is_alive():
+            _event_worker = threading.Thread(target=event_flush_loop, name="9dttt-events", daemon=True)
+            _event_worker.start()
+
+def drain_event_queue():
+    events = []
+    while True:
+        try:
+            events.append(EVENT_QUEUE.get_nowait())
+        except queue.Empty:
+            return events
+
+def event_flush_loop():
+    while True:
+        first = EVENT_QUEUE.get()
+        time.sleep(EVENT_FLUSH_WINDOW)
+        try:
+            flush_events([first] + drain_event_queue())
+        except Exception as e:
+            # Never let one bad batch kill the worker
+            logging.error(f"Event flush loop error: {e}")
+
 @app.post("/9dttt-event")
 def game_event():
-    if not request.json:
+    try:
+        event = orjson.loads(request.get_data())
+    except orjson.JSONDecodeError:
+        event = None
+    if not event or not isinstance(event, dict):
         return {"error": "JSON required"}, 400
-    game_event_bridge(request.json)
-    return {"ok": True}
+    try:
+        EVENT_QUEUE.put_nowait(event)
+    except queue.Full:
+        logging.warning("Event queue full (%d), dropping: %s", EVENT_QUEUE_MAX, event)
+        return {"error": "Event queue full"}, 503
+    ensure_event_worker()
+    return {"ok": True}, 202
 
 # ------------------------------------------------------------
 # FILES & MEDIA
 # ------------------------------------------------------------
 PROCESSED_MENTIONS_FILE = "9dttt_processed_mentions.json"
+PROCESSED_MENTIONS_LOG = "9dttt_processed_mentions.ndjson"
 MEDIA_FOLDER = "media/"
 
 def load_json_set(fn):
     if os.path.exists(fn):
-        with open(fn, 'r') as f:
-            return set(json.load(f))
+        with open(fn, 'rb') as f:
+            return set(orjson.loads(f.read()))
     return set()
 
 def save_json_set(data, fn):
+    # Write to a temp file and swap it in, so a failed write never leaves a torn snapshot
+    tmp = f"{fn}.tmp"
     try:
-        with open(fn, 'w') as f:
-            json.dump(list(data), f)
+        with open(tmp, 'wb') as f:
+            f.write(orjson.dumps(list(data)))
+        os.replace(tmp, fn)
+        return True
     except Exception as e:
         logging.error(f"Save {fn} failed: {e}")
+        return False
+
+# Processed mention IDs live in memory for the process lifetime. New IDs are
+# appended to an ndjson log as they happen; the JSON snapshot is only rewritten
+# (and the log compacted) at the end of a cycle that actually added something.
+def load_processed_mentions():
+    # Tweet IDs are kept as ints (older snapshots stored them as strings)
+    try:
+        processed = {int(x) for x in load_json_set(PROCESSED_MENTIONS_FILE)}
+    except (orjson.JSONDecodeError, TypeError, ValueError) as e:
+        logging.warning("Bad %s, ignoring snapshot: %s", PROCESSED_MENTIONS_FILE, e)
+        processed = set()
+    if os.path.exists(PROCESSED_MENTIONS_LOG):
+        with open(PROCESSED_MENTIONS_LOG, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    processed.add(int(orjson.loads(line)))
+                except (orjson.JSONDecodeError, TypeError, ValueError):
+                    logging.warning("Skipping malformed line in %s: %r", PROCESSED_MENTIONS_LOG, line)
+    return processed
+
+def log_processed_mention(tweet_id):
+    try:
+        with open(PROCESSED_MENTIONS_LOG, 'ab') as f:
+            f.write(orjson.dumps(tweet_id) + b"\n")
+    except Exception as e:
+        logging.error(f"Append {PROCESSED_MENTIONS_LOG} failed: {e}")
+
+def compact_processed_mentions():
+    # Keep the log unless the snapshot really holds its IDs
+    if not save_json_set(PROCESSED_MENTIONS, PROCESSED_MENTIONS_FILE):
+        return
+    try:
+        open(PROCESSED_MENTIONS_LOG, 'w').close()
+    except Exception as e:
+        logging.error(f"Truncate {PROCESSED_MENTIONS_LOG} failed: {e}")
+
+PROCESSED_MENTIONS = load_processed_mentions()
+
+MEDIA_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.mp4')
+VIDEO_EXTENSIONS = ('.mp4',)
+VIDEO_CHUNK_SIZE = 5 * 1024 * 1024  # max APPEND segment size
+_MEDIA_CACHE = {"mtime": 0, "files": []}
+# Images are small and uploaded often, so keep their bytes in memory, loaded on
+# first upload. Each blob is keyed on the file's (st_mtime, st_size) and checked
+# per upload, so an image overwritten in place (which leaves the folder mtime
+# alone) is re-read. Videos can be tens of MB and are still read from disk.
+MEDIA_BLOBS = {}
+
+def get_media_blob(path):
+    st = os.stat(path)
+    key = (st.st_mtime, st.st_size)
+    cached = MEDIA_BLOBS.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(path, 'rb') as f:
+        blob = f.read()
+    MEDIA_BLOBS[path] = (key, blob)
+    return blob
+
+def get_media_files():
+    # Re-scan only when the folder's mtime changes (files added/removed/renamed)
+    try:
+        mtime = os.stat(MEDIA_FOLDER).st_mtime
+    except OSError:
+        return []
+    if mtime != _MEDIA_CACHE["mtime"]:
+        with os.scandir(MEDIA_FOLDER) as it:
+            files = [e.path for e in it if e.is_file() and e.name.lower().endswith(MEDIA_EXTENSIONS)]
+        for gone in set(MEDIA_BLOBS) - set(files):
+            del MEDIA_BLOBS[gone]
+        _MEDIA_CACHE["files"] = files
+        _MEDIA_CACHE["mtime"] = mtime
+    return _MEDIA_CACHE["files"]
 
 def get_random_media_id():
-    if not os.path.exists(MEDIA_FOLDER):
-        return None
-    files = [f for f in os.listdir(MEDIA_FOLDER) if f.lower().endswith(('.png','.jpg','.jpeg','.gif','.mp4'))]
+    files = get_media_files()
     if not files:
         return None
-    path = os.path.join(MEDIA_FOLDER, random.choice(files))
+    path = random.choice(files)
     try:
-        media = api_v1.media_upload(path)
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            # Simple upload fails on larger videos; use chunked INIT/APPEND/FINALIZE
+            media = api_v1.media_upload(
+                path, chunked=True, media_category="tweet_video",
+                chunk_size=VIDEO_CHUNK_SIZE, wait_for_async_finalize=True
+            )
+        else:
+            blob = get_media_blob(path)
+            media = api_v1.media_upload(filename=os.path.basename(path), file=io.BytesIO(blob))
         return media.media_id_string
     except Exception as e:
         logging.error(f"Media upload fail: {e}")
@@ -167,16 +422,20 @@ PERSONALITY_TONES = {
     'mystical': ["In 9 dimensions, all moves are one.", "The grid transcends reality...", "Your move echoes through dimensional space.", "Beyond X and O, there is only strategy.", "The multiverse observes your play.", "Time is relative. Victory is absolute.", "9 dimensions. Infinite possibilities. One winner."]
 }
 
-def pick_tone():
-    roll = random.random()
-    if roll < 0.05: return 'glitch'
-    if roll < 0.15: return 'mystical'
-    if roll < 0.40: return 'competitive'
-    if roll < 0.60: return 'friendly'
-    return 'neutral'
+TONE_WEIGHTS = {'glitch': 0.05, 'mystical': 0.10, 'competitive': 0.25, 'friendly': 0.20, 'neutral': 0.40}
+
+# Flatten tone -> lines into one population, spreading each tone's probability
+# evenly over its lines, so a single weighted draw picks tone and line together.
+PERSONALITY_LINES = [line for tone in TONE_WEIGHTS for line in PERSONALITY_TONES[tone]]
+PERSONALITY_WEIGHTS = [TONE_WEIGHTS[tone] / len(PERSONALITY_TONES[tone])
+                       for tone in TONE_WEIGHTS for _ in PERSONALITY_TONES[tone]]
+# random.choices rebuilds cumulative weights on every call; precompute them and
+# bisect directly, which is cheaper than even the old two-draw pick_tone path
+PERSONALITY_CUM_WEIGHTS = list(itertools.accumulate(PERSONALITY_WEIGHTS))
+PERSONALITY_TOTAL_WEIGHT = PERSONALITY_CUM_WEIGHTS[-1]
 
 def get_personality_line():
-    return random.choice(PERSONALITY_TONES[pick_tone()])
+    return PERSONALITY_LINES[bisect.bisect(PERSONALITY_CUM_WEIGHTS, random.random() * PERSONALITY_TOTAL_WEIGHT)]
 
 TIME_PHRASES = {
     'morning': 'Morning grids are loading. Time to think in 9D.',
@@ -260,17 +519,30 @@ RESPOND IN ONE SHORT LINE. Keep responses under 200 characters for Twitter.
 Tone variations: competitive, friendly, glitchy, neutral, or mystical.
 """
 
+HF_URL = "https://api-inference.huggingface.co/models/gpt2"
+
+# Keep-alive session so every reply reuses one TLS connection to HF.
+# Retries cover model cold starts (503) and brief upstream hiccups.
+HF_SESSION = None
+if HUGGING_FACE_TOKEN:
+    HF_SESSION = requests.Session()
+    HF_SESSION.headers.update({"Authorization": f"Bearer {HUGGING_FACE_TOKEN}"})
+    _hf_retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 502, 503, 504),
+                      allowed_methods=frozenset(["POST"]), raise_on_status=False)
+    HF_SESSION.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=_hf_retry))
+
+# Worker pool for composing replies; sized to match the HF connection pool
+LLM_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="9dttt-llm")
+
 def generate_llm_response(prompt, max_tokens=100):
     global USE_LLM
     if not USE_LLM or not HUGGING_FACE_TOKEN:
         logging.info("LLM skipped (no paid tier or no token)")
         return None
     try:
-        url = "https://api-inference.huggingface.co/models/gpt2"
-        headers = {"Authorization": f"Bearer {HUGGING_FACE_TOKEN}"}
         full_prompt = f"{SYSTEM_PROMPT}\n\nUser: {prompt}\n9DTTT Bot:"
         data = {"inputs": full_prompt, "parameters": {"max_new_tokens": max_tokens}}
-        r = requests.post(url, headers=headers, json=data, timeout=HUGGING_FACE_TIMEOUT)
+        r = HF_SESSION.post(HF_URL, json=data, timeout=HUGGING_FACE_TIMEOUT)
         if r.status_code == 200:
             res = r.json()
             if isinstance(res, list) and res:
@@ -279,7 +551,7 @@ def generate_llm_response(prompt, max_tokens=100):
                     return generated.split("9DTTT Bot:")[-1].strip()[:200]
                 return generated[:200]
         elif r.status_code in [402, 429]:
-            logging.warning(f"HF cost/rate issue: {r.status_code} - {r.text}")
+            logging.warning("HF cost/rate issue: %s - %s", r.status_code, r.text)
             USE_LLM = False
         else:
             logging.error(f"HF error {r.status_code}: {r.text}")
@@ -290,51 +562,124 @@ def generate_llm_response(prompt, max_tokens=100):
 # ------------------------------------------------------------
 # EVENT HANDLERS (Upgraded)
 # ------------------------------------------------------------
-def game_event_bridge(event):
-    etype = event.get("type")
-    player = event.get("player", "Mystery Strategist")
+def handle_win_event(event):
+    player = str(event.get("player", "Mystery Strategist"))
     opponent = event.get("opponent", "the void")
     dims = event.get("dimensions", "the multiverse")
     score = event.get("score", "")
+    if score:
+        msg = f"BOOM! {player} crushed {opponent} {score} — dimensional domination! 🔥"
+    else:
+        msg = f"VICTORY in {dims}! {player} claims supremacy over {opponent}. Legendary."
+    post_update(msg + f"\nCongrats @{player.replace(' ', '')}!")
+
+def handle_game_start_event(event):
+    player = event.get("player", "Mystery Strategist")
+    opponent = event.get("opponent", "the void")
+    post_update(f"New 9D battle: {player} vs {opponent}. Who claims the grid? Place your bets 👀")
+
+def handle_achievement_event(event):
+    player = event.get("player", "Mystery Strategist")
+    ach = event.get('achievement', 'Unknown Achievement')
+    post_update(f"🏆 {player} unlocked: {ach}! Absolute legend status.")
+
+def handle_tournament_event(event):
+    name = event.get('name', 'Dimensional Tournament')
+    parts = event.get('participants', '?')
+    post_update(f"TOURNAMENT: {name} - {parts} players competing!")
+
+def handle_leaderboard_event(event):
+    top = event.get('top', 'Champion')
+    rank = event.get('rank', '#1')
+    post_update(f"LEADERBOARD UPDATE: {top} holds {rank}!")
+
+EVENT_HANDLERS = {
+    "win": handle_win_event,
+    "game_start": handle_game_start_event,
+    "achievement": handle_achievement_event,
+    "tournament": handle_tournament_event,
+    "leaderboard": handle_leaderboard_event,
+}
+
+def game_event_bridge(event):
+    handler = EVENT_HANDLERS.get(event.get("type"))
+    if handler:
+        handler(event)
+    logging.info("Processed event: %s", event)
 
+_UPDATE_HEADER = f"🎮 {BOT_NAME} UPDATE 🎮\n\n"
+_UPDATE_FOOTER = f"\n\n{GAME_LINK}"
+_UPDATE_OVERHEAD = twitter_weighted_len(_UPDATE_HEADER) + twitter_weighted_len(_UPDATE_FOOTER)
+
+def fit_list(prefix, items, suffix, noun, sep=", "):
+    # Join as many whole items as fit in one post_update, then "and N more".
+    # Items are never cut, so a trimmed @handle can't tag someone else.
+    # If not even one fits, fall back to a bare count: "3 <noun>".
+    limit = TWITTER_CHAR_LIMIT - _UPDATE_OVERHEAD
+    items = [str(item) for item in items]  # event fields are arbitrary JSON
+
+    def render(k):
+        more = len(items) - k
+        listed = sep.join(items[:k])
+        if more:
+            listed += f" and {more} more" if k else f"{more} {noun}"
+        return prefix + listed + suffix
+
+    k = 0
+    while k < len(items) and twitter_weighted_len(render(k + 1)) <= limit:
+        k += 1
+    return render(k)
+
+def summarize_events(etype, events):
+    n = len(events)
     if etype == "win":
-        if score:
-            msg = f"BOOM! {player} crushed {opponent} {score} — dimensional domination! 🔥"
-        else:
-            msg = f"VICTORY in {dims}! {player} claims supremacy over {opponent}. Legendary."
-        post_update(msg + f"\nCongrats @{player.replace(' ', '')}!")
+        handles = [f"@{str(e.get('player', 'Mystery Strategist')).replace(' ', '')}" for e in events]
+        post_update(fit_list(f"BOOM! {n} victories in the last minute — dimensional domination! 🔥\nCongrats ", handles, "!", "winners"))
 
     elif etype == "game_start":
-        msg = f"New 9D battle: {player} vs {opponent}. Who claims the grid? Place your bets 👀"
-        post_update(msg)
+        matches = [f"{e.get('player', 'Mystery Strategist')} vs {e.get('opponent', 'the void')}" for e in events]
+        post_update(fit_list(f"{n} new 9D battles: ", matches, ". Who claims the grid? Place your bets 👀", "battles"))
 
     elif etype == "achievement":
-        ach = event.get('achievement', 'Unknown Achievement')
-        msg = f"🏆 {player} unlocked: {ach}! Absolute legend status."
-        post_update(msg)
+        unlocks = [f"{e.get('player', 'Mystery Strategist')}: {e.get('achievement', 'Unknown Achievement')}" for e in events]
+        post_update(fit_list(f"🏆 {n} achievements unlocked! ", unlocks, ". Absolute legends.", "achievements", sep="; "))
 
     elif etype == "tournament":
-        name = event.get('name', 'Dimensional Tournament')
-        parts = event.get('participants', '?')
-        msg = f"TOURNAMENT: {name} - {parts} players competing!"
-        post_update(msg)
+        names = [e.get('name', 'Dimensional Tournament') for e in events]
+        post_update(fit_list(f"TOURNAMENTS: {n} live now - ", names, "!", "tournaments"))
 
     elif etype == "leaderboard":
-        top = event.get('top', 'Champion')
-        rank = event.get('rank', '#1')
-        msg = f"LEADERBOARD UPDATE: {top} holds {rank}!"
-        post_update(msg)
+        # Only the latest standing matters
+        game_event_bridge(events[-1])
+        return
+
+    logging.info("Processed %d %s events", n, etype)
 
-    logging.info(f"Processed event: {event}")
+def flush_events(events):
+    groups = {}
+    for event in events:
+        try:
+            groups.setdefault(event.get("type"), []).append(event)
+        except TypeError:
+            # e.g. {"type": []} is valid JSON but can't be a dict key
+            logging.warning("Dropping event with unusable type: %s", event)
+    for etype, batch in groups.items():
+        try:
+            if len(batch) == 1:
+                game_event_bridge(batch[0])
+            else:
+                summarize_events(etype, batch)
+        except Exception as e:
+            logging.error(f"Event flush ({etype}) failed: {e}")
 
 def post_update(text):
-    tag = get_personality_line()
-    full = f"🎮 {BOT_NAME} UPDATE 🎮\n\n{text}\n\n{tag}\n\n{GAME_LINK}"
-    if len(full) > TWITTER_CHAR_LIMIT:
-        max_t = TWITTER_CHAR_LIMIT - len(f"🎮 \n\n{GAME_LINK}")
-        full = f"🎮 {text[:max_t]}\n\n{GAME_LINK}"
+    body = f"{text}\n\n{get_personality_line()}"
+    if _UPDATE_OVERHEAD + twitter_weighted_len(body) > TWITTER_CHAR_LIMIT:
+        # Drop the personality tag first, then trim the text itself
+        body = truncate_weighted(text, TWITTER_CHAR_LIMIT - _UPDATE_OVERHEAD)
+    full = _UPDATE_HEADER + body + _UPDATE_FOOTER
     if safe_post_tweet(full):
-        logging.info(f"Update: {text}")
+        logging.info("Update: %s", text)
     else:
         logging.error("Update failed")
 
@@ -374,15 +719,15 @@ def bot_broadcast():
         evt = get_random_event()
         per = get_personality_line()
         msg = f"🔔 GAME ALERT 🔔\n\n{evt}\n\n{per}\n\nJoin the action: {GAME_LINK}"
-    if len(msg) > TWITTER_CHAR_LIMIT:
-        max_t = TWITTER_CHAR_LIMIT - len(f"🎮 \n\n{GAME_LINK}")
-        msg = f"🎮 {get_random_event()[:max_t]}\n\n{GAME_LINK}"
+    if twitter_weighted_len(msg) > TWITTER_CHAR_LIMIT:
+        max_t = TWITTER_CHAR_LIMIT - twitter_weighted_len(f"🎮 \n\n{GAME_LINK}")
+        msg = f"🎮 {truncate_weighted(get_random_event(), max_t)}\n\n{GAME_LINK}"
     mids = None
     if random.random() > 0.4:
         mid = get_random_media_id()
         if mid: mids = [mid]
     if safe_post_tweet(msg, media_ids=mids):
-        logging.info(f"Broadcast: {typ}")
+        logging.info("Broadcast: %s", typ)
     else:
         logging.error("Broadcast failed")
 
@@ -447,52 +792,152 @@ def generate_contextual_response(username, message):
             return f"@{username} {llm_resp}"
     
     resp = random.choice(opts)
-    if len(resp) > TWITTER_CHAR_LIMIT:
-        max_l = TWITTER_CHAR_LIMIT - len(f"@{username} \n\n{GAME_LINK}")
-        resp = f"@{username} {get_personality_line()[:max_l]}\n\n{GAME_LINK}"
+    if twitter_weighted_len(resp) > TWITTER_CHAR_LIMIT:
+        max_l = TWITTER_CHAR_LIMIT - twitter_weighted_len(f"@{username} \n\n{GAME_LINK}")
+        resp = f"@{username} {truncate_weighted(get_personality_line(), max_l)}\n\n{GAME_LINK}"
     return resp
 
+# Likes are deferred to their own low-priority job so a slow or rate-limited
+# like never delays or fails a reply. deque append/popleft are thread-safe.
+LIKE_QUEUE = collections.deque(maxlen=500)
+LIKES_PER_DRAIN = 10
+
+def drain_likes():
+    for _ in range(min(LIKES_PER_DRAIN, len(LIKE_QUEUE))):
+        tweet_id = LIKE_QUEUE.popleft()
+        try:
+            client.like(tweet_id)
+        except Exception as e:
+            logging.warning("Like %s failed: %s", tweet_id, e)
+
+def compose_reply(un, umsg):
+    ml = umsg.lower()
+
+    # Challenge detection
+    if any(word in ml for word in ['challenge', 'play me', 'vs', 'battle', '1v1', 'game me']):
+        resp = f"@{un} Challenge accepted! Head to {GAME_LINK} and start a game — tag me when you win (or lose 😏). Let's see your 9D skills!"
+        personality = random.choice(PERSONALITY_TONES['competitive'])
+        return f"{resp}\n\n{personality}"
+
+    if any(word in ml for word in ['won', 'i won', 'beat', 'victory']):
+        resp = f"@{un} You beat the grid? Respect! Post a screenshot or tell me the dimensions you conquered 🔥 {GAME_LINK}"
+        personality = random.choice(PERSONALITY_TONES['friendly'])
+        return f"{resp}\n\n{personality}"
+
+    # generate_contextual_response already includes GAME_LINK
+    return generate_contextual_response(un, umsg)
+
+def send_reply(m, un, full_resp):
+    if safe_post_tweet(full_resp, in_reply_to_tweet_id=m.id):
+        LIKE_QUEUE.append(m.id)
+        PROCESSED_MENTIONS.add(m.id)
+        log_processed_mention(m.id)
+        logging.info("Replied @%s", un)
+    else:
+        logging.error(f"Reply @{un} failed")
+
 def bot_respond():
-    processed = load_json_set(PROCESSED_MENTIONS_FILE)
+    processed = PROCESSED_MENTIONS
+    initial_len = len(processed)
     try:
-        me = client.get_me()
-        if not me or not me.data: return
-        mentions = client.get_users_mentions(me.data.id, max_results=50, tweet_fields=["author_id", "text"])
+        if BOT_USER_ID is None and not cache_bot_identity(): return
+        # Authors come back in includes["users"] via the expansion — no follow-up lookups
+        mentions = client.get_users_mentions(
+            BOT_USER_ID, max_results=50, tweet_fields=["author_id", "text"],
+            expansions=["author_id"], user_fields=["username"]
+        )
         if not mentions.data: return
-        for m in mentions.data:
-            tid = str(m.id)
-            if tid in processed: continue
-            uid = m.author_id
-            ud = client.get_user(id=uid)
-            if not ud or not ud.data: continue
-            un = ud.data.username
-            umsg = m.text.replace(f"@{me.data.username}", "").strip()
-            ml = umsg.lower()
-
-            # Challenge detection
-            if any(word in ml for word in ['challenge', 'play me', 'vs', 'battle', '1v1', 'game me']):
-                resp = f"@{un} Challenge accepted! Head to {GAME_LINK} and start a game — tag me when you win (or lose 😏). Let's see your 9D skills!"
-                personality = random.choice(PERSONALITY_TONES['competitive'])
-                full_resp = f"{resp}\n\n{personality}"
-
-            elif any(word in ml for word in ['won', 'i won', 'beat', 'victory']):
-                resp = f"@{un} You beat the grid? Respect! Post a screenshot or tell me the dimensions you conquered 🔥 {GAME_LINK}"
-                personality = random.choice(PERSONALITY_TONES['friendly'])
-                full_resp = f"{resp}\n\n{personality}"
+        new_mentions = [m for m in mentions.data if m.id not in processed]
+        if not new_mentions: return
+        id2name = {u.id: u.username for u in mentions.includes.get("users", [])}
+        # Compose the whole batch in parallel so one slow HF call doesn't hold up the rest
+        pending = {}
+        for m in new_mentions:
+            un = id2name.get(m.author_id)
+            if not un: continue
+            umsg = MENTION_RE.sub("", m.text).strip()
+            pending[LLM_POOL.submit(compose_reply, un, umsg)] = (m, un)
+        for fut in as_completed(pending):
+            m, un = pending[fut]
+            # One failed compose/post must not throw away the rest of the batch
+            try:
+                send_reply(m, un, fut.result())
+            except Exception as e:
+                logging.error(f"Reply to mention {m.id} error: {e}")
+    except Exception as e:
+        logging.error(f"Mentions error: {e}")
+    if len(processed) != initial_len:
+        compact_processed_mentions()
 
-            else:
-                # generate_contextual_response already includes GAME_LINK
-                full_resp = generate_contextual_response(un, umsg)
+def handle_stream_mention(m, un):
+    try:
+        umsg = MENTION_RE.sub("", m.text).strip()
+        send_reply(m, un, compose_reply(un, umsg))
+    except Exception as e:
+        logging.error(f"Stream mention {m.id} error: {e}")
 
-            if safe_post_tweet(full_resp, in_reply_to_tweet_id=m.id):
-                client.like(m.id)
-                processed.add(tid)
-                logging.info(f"Replied @{un}")
-            else:
-                logging.error(f"Reply @{un} failed")
-        save_json_set(processed, PROCESSED_MENTIONS_FILE)
+class MentionStream(tweepy.StreamingClient):
+    stopping = False
+
+    def disconnect(self):
+        self.stopping = True
+        super().disconnect()
+
+    def on_response(self, response):
+        m = response.data
+        # Errors-only payloads (e.g. operational-disconnect) carry no tweet
+        if m is None or m.id in PROCESSED_MENTIONS:
+            return
+        id2name = {u.id: u.username for u in response.includes.get("users", [])}
+        un = id2name.get(m.author_id)
+        if not un:
+            return
+        # Hand off so the stream thread goes straight back to reading
+        LLM_POOL.submit(handle_stream_mention, m, un)
+
+    def on_errors(self, errors):
+        logging.error(f"Mention stream errors: {errors}")
+
+    def on_connection_error(self):
+        logging.warning("Mention stream connection error, reconnecting")
+
+    def on_exception(self, exception):
+        logging.error(f"Mention stream crashed: {exception}")
+
+    def on_disconnect(self):
+        # tweepy calls this whenever the stream thread exits, for any reason.
+        # Unless we asked it to stop, fall back to polling so mentions keep flowing.
+        if self.stopping:
+            return
+        logging.warning("Mention stream stopped, falling back to polling")
+        schedule_mention_polling(run_now=True)
+
+MENTION_STREAM_TAG = "9dttt-mentions"
+
+def start_mention_stream():
+    if BOT_USERNAME is None and not cache_bot_identity():
+        return None
+    try:
+        stream = MentionStream(BEARER_TOKEN, wait_on_rate_limit=True)
+        # Rules persist server-side and are shared by every consumer of this app's
+        # bearer token, so only replace the ones carrying our own tag
+        rules = stream.get_rules()
+        ours = [r.id for r in (rules.data or []) if r.tag == MENTION_STREAM_TAG]
+        if ours:
+            stream.delete_rules(ours)
+        stream.add_rules(tweepy.StreamRule(f"@{BOT_USERNAME} -from:{BOT_USERNAME} -is:retweet", tag=MENTION_STREAM_TAG))
+        # Stop polling before the stream thread exists: if it dies early, its
+        # on_disconnect re-adds the job and nothing here can undo that
+        scheduler.remove_job('respond')
+        stream.filter(
+            threaded=True, tweet_fields=["author_id", "text"],
+            expansions=["author_id"], user_fields=["username"]
+        )
+        return stream
     except Exception as e:
-        logging.error(f"Mentions error: {e}")
+        logging.error(f"Mention stream failed to start: {e}")
+        schedule_mention_polling()
+        return None
 
 def bot_retweet_hunt():
     q = "(tic-tac-toe OR tictactoe OR strategy games OR puzzle games OR board games OR gaming) filter:media min_faves:5 -is:retweet"
@@ -503,7 +948,7 @@ def bot_retweet_hunt():
             if random.random() > 0.75:
                 try:
                     client.retweet(t.id)
-                    logging.info(f"RT {t.id}")
+                    logging.info("RT %s", t.id)
                 except:
                     pass
     except Exception as e:
@@ -528,7 +973,7 @@ def bot_hype_commentator():
 
 def bot_diagnostic():
     diag = f"🎮 9DTTT DIAGNOSTIC 🎮\n\nSystem Status: {'ONLINE (Paid Mode)' if PAID_TIER else 'ONLINE (Lite/Free Mode)'}\nGrid Status: ACTIVE\nDimensions: ALL 9 OPERATIONAL\n\n{random.choice(MOTIVATIONAL)}\n\n🕹️ {GAME_LINK}"
-    if safe_post_tweet(diag[:TWITTER_CHAR_LIMIT]):
+    if safe_post_tweet(truncate_weighted(diag, TWITTER_CHAR_LIMIT)):
         logging.info("Diagnostic posted")
     else:
         logging.error("Diagnostic failed")
@@ -536,18 +981,27 @@ def bot_diagnostic():
 # ------------------------------------------------------------
 # SCHEDULER + STARTUP
 # ------------------------------------------------------------
-scheduler = BackgroundScheduler()
-# Use average of min/max for consistent behavior
-BROADCAST_INTERVAL = (BROADCAST_MIN_INTERVAL + BROADCAST_MAX_INTERVAL) // 2
-MENTION_CHECK_INTERVAL = (MENTION_CHECK_MIN_INTERVAL + MENTION_CHECK_MAX_INTERVAL) // 2
-scheduler.add_job(bot_broadcast, 'interval', minutes=BROADCAST_INTERVAL)
-scheduler.add_job(bot_respond, 'interval', minutes=MENTION_CHECK_INTERVAL)
+scheduler = BlockingScheduler()
+
+def schedule_mention_polling(run_now=False):
+    # replace_existing makes this safe to call again when a stream dies;
+    # run_now catches up on mentions missed while the stream was down
+    extra = {"next_run_time": datetime.now()} if run_now else {}
+    scheduler.add_job(bot_respond, 'interval', id='respond', minutes=MENTION_CHECK_MIN_INTERVAL,
+                      jitter=(MENTION_CHECK_MAX_INTERVAL - MENTION_CHECK_MIN_INTERVAL) * 60,
+                      replace_existing=True, **extra)
+
+# Fire every MIN minutes plus a fresh random delay of up to (MAX - MIN) minutes
+# each run, so the cadence stays within min/max without being predictable.
+scheduler.add_job(bot_broadcast, 'interval', id='broadcast', minutes=BROADCAST_MIN_INTERVAL,
+                  jitter=(BROADCAST_MAX_INTERVAL - BROADCAST_MIN_INTERVAL) * 60)
+schedule_mention_polling()
+scheduler.add_job(drain_likes, 'interval', minutes=5)
 scheduler.add_job(bot_retweet_hunt, 'interval', hours=1)
 scheduler.add_job(bot_hype_commentator, 'interval', minutes=120)  # 2 hours
 scheduler.add_job(bot_diagnostic, 'cron', hour=8)
-scheduler.start()
 
-logging.info(f"{BOT_NAME} ONLINE 🎮 (Paid Tier: {PAID_TIER})")
+logging.info("%s ONLINE 🎮 (Paid Tier: %s)", BOT_NAME, PAID_TIER)
 
 try:
     activation_msgs = [
@@ -556,23 +1010,31 @@ try:
         f"📡 GRID INITIALIZED 📡\n\n9D Tic-Tac-Toe system active.\nPlayers welcome. Strategies encouraged.\nVictory awaits the bold.\n\n{random.choice(MOTIVATIONAL)}\n\n🕹️ {GAME_LINK}"
     ]
     msg = random.choice(activation_msgs)
-    if len(msg) > TWITTER_CHAR_LIMIT:
+    if twitter_weighted_len(msg) > TWITTER_CHAR_LIMIT:
         msg = f"🎮 {BOT_NAME} ONLINE 🎮\n\n9D Grid Active\n{random.choice(MOTIVATIONAL)[:100]}\n\n🕹️ {GAME_LINK}"
     if safe_post_tweet(msg):
         logging.info("Activation posted")
     else:
         logging.warning("Activation failed (duplicate or tier issue?)")
 except Exception as e:
-    logging.warning(f"Activation error: {e}")
+    logging.warning("Activation error: %s", e)
 
 # ------------------------------------------------------------
 # MAIN
 # ------------------------------------------------------------
 if __name__ == "__main__":
+    mention_stream = start_mention_stream() if USE_MENTION_STREAM else None
+    if mention_stream:
+        logging.info("Mentions: filtered stream (polling disabled)")
+    else:
+        logging.info("Mentions: polling every %d-%d min", MENTION_CHECK_MIN_INTERVAL, MENTION_CHECK_MAX_INTERVAL)
     try:
-        logging.info(f"{BOT_NAME} main loop - monitoring...")
-        while True:
-            time.sleep(300)
+        logging.info("%s main loop - monitoring...", BOT_NAME)
+        scheduler.start()  # blocks until shutdown; jobs run on the scheduler's thread pool
     except (KeyboardInterrupt, SystemExit):
-        scheduler.shutdown()
-        logging.info(f"{BOT_NAME} shutdown. Grid awaits return.")
+        if mention_stream:
+            mention_stream.disconnect()
+            compact_processed_mentions()  # stream mode only appends to the log
+        if scheduler.running:
+            scheduler.shutdown(wait=False)
+        logging.info("%s shutdown. Grid awaits return.", BOT_NAME)